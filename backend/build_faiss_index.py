@@ -0,0 +1,30 @@
+# build_faiss_index.py
+# One-time rebuild of the exact (flat inner-product) FAISS index as an ANN index.
+# Small corpora get HNSW; from LARGE_CORPUS docs on, IVF-PQ also compresses vectors.
+import math
+import faiss
+
+SRC = "data/faiss_index_384.index"
+DST = "data/faiss_hnsw_384.index"
+
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+LARGE_CORPUS = 100_000
+PQ_SUBQUANTIZERS = 48
+
+if __name__ == "__main__":
+    flat = faiss.read_index(SRC)
+    xb = flat.reconstruct_n(0, flat.ntotal)
+    n, d = xb.shape
+
+    if n >= LARGE_CORPUS:
+        nlist = int(math.sqrt(n))
+        quantizer = faiss.IndexFlatIP(d)
+        index = faiss.IndexIVFPQ(quantizer, d, nlist, PQ_SUBQUANTIZERS, 8, faiss.METRIC_INNER_PRODUCT)
+        index.train(xb)
+    else:
+        index = faiss.IndexHNSWFlat(d, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    index.add(xb)
+    faiss.write_index(index, DST)
+    print(f"Saved {DST} ({type(index).__name__}, {n} x {d})")
@@ -0,0 +1,17 @@
+# build_text_store.py
+# One-time conversion of the advisory texts from JSONL to the mmap-friendly
+# offsets + UTF-8 blob format read by src.text_store.TextStore.
+import json
+from src.text_store import write_text_store
+
+SRC = "data/qa_dataset_final.jsonl"
+OFFSETS = "data/texts_offsets.npy"
+BLOB = "data/texts.bin"
+
+if __name__ == "__main__":
+    texts = []
+    with open(SRC, "r", encoding="utf-8") as f:
+        for line in f:
+            texts.append(json.loads(line)["text"])
+    write_text_store(texts, OFFSETS, BLOB)
+    print(f"Saved {len(texts)} texts to {OFFSETS} + {BLOB}")
@@ -0,0 +1,15 @@
+# convert_statevectors.py
+# One-time conversion of the precomputed doc statevectors to float16.
+# RY + CNOT circuits only produce real amplitudes, so the imaginary part is dropped.
+import numpy as np
+
+SRC = "data/doc_statevectors.npy"
+DST = "data/doc_statevectors_f16.npy"
+
+if __name__ == "__main__":
+    sv = np.load(SRC)
+    assert np.max(np.abs(sv.imag)) < 1e-6, "statevectors are not real-valued"
+    sv16 = np.ascontiguousarray(sv.real.astype(np.float16))
+    np.save(DST, sv16)
+    err = np.max(np.abs(sv16.astype(np.float32) - sv.real))
+    print(f"Saved {DST} {sv16.shape} {sv16.dtype} (max abs error {err:.2e})")
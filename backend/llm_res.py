@@ -1,13 +1,19 @@
 # llm_response.py
 import os
-from groq import Groq
-from src.query_pipeline import full_pipeline
+import json
+from groq import Groq, AsyncGroq
+from src.query_pipeline import full_pipeline, full_pipeline_async
+from src.response_cache import ResponseCache
 from dotenv import load_dotenv
 load_dotenv()
 # -----------------------
 # Initialize Groq client
 # -----------------------
 client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+async_client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"))
+
+# Advisories keyed by the full Groq request (temperature 0, so repeats are stable)
+advisory_cache = ResponseCache("llm:advisory:", ttl=3600, redis_url=os.getenv("REDIS_URL"))
 
 def generate_advisory(query, top_k=5):
     """
@@ -15,7 +21,51 @@ def generate_advisory(query, top_k=5):
     """
     # Step 1: Run your quantum retrieval pipeline
     results = full_pipeline(query, top_k=top_k)
-    
+    return advise_from_results(query, results)
+
+async def generate_advisory_async(query, top_k=5):
+    """
+    Async variant of generate_advisory; retrieval is micro-batched with concurrent requests
+    and the Groq call does not block the event loop.
+    """
+    results = await full_pipeline_async(query, top_k=top_k)
+    request = advisory_request(query, results)
+    cache_key = ResponseCache.make_key(json.dumps(request, sort_keys=True))
+    cached = await advisory_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    stream = await async_client.chat.completions.create(**request)
+
+    response_text = ""
+    async for chunk in stream:
+        if chunk.choices[0].delta and chunk.choices[0].delta.content:
+            response_text += chunk.choices[0].delta.content
+
+    response_text = response_text.strip()
+    await advisory_cache.set(cache_key, response_text)
+    return response_text
+
+def advise_from_results(query, results):
+    """
+    Queries the Groq model with the advisory prompt built from reranked results.
+    """
+    stream = client.chat.completions.create(**advisory_request(query, results))
+
+    # Step 5: Stream and assemble the response
+    response_text = ""
+    for chunk in stream:
+        if chunk.choices[0].delta and chunk.choices[0].delta.content:
+            piece = chunk.choices[0].delta.content
+            response_text += piece
+            print(piece, end="", flush=True)  # live output
+
+    return response_text.strip()
+
+def advisory_request(query, results):
+    """
+    Builds the Groq chat completion arguments for the reranked results.
+    """
     # Step 2: Build context
     context = "\n".join([f"- {r[0]}" for r in results])
     # Step 3: Domain-specific prompt
@@ -37,7 +87,7 @@ Avoid technical jargon.
     """
 
     # Step 4: Use Groq's reasoning-capable model (gpt-oss-120b)
-    stream = client.chat.completions.create(
+    return dict(
         model="openai/gpt-oss-120b",
         messages=[{"role": "user", "content": prompt}],
         temperature=0,
@@ -47,16 +97,6 @@ Avoid technical jargon.
         stream=True
     )
 
-    # Step 5: Stream and assemble the response
-    response_text = ""
-    for chunk in stream:
-        if chunk.choices[0].delta and chunk.choices[0].delta.content:
-            piece = chunk.choices[0].delta.content
-            response_text += piece
-            print(piece, end="", flush=True)  # live output
-
-    return response_text.strip()
-
 
 # -----------------------
 # Test the pipeline
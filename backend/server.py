@@ -1,25 +1,31 @@
 # =========================================================
 # Imports & Setup
 # =========================================================
-from fastapi import FastAPI, Depends, HTTPException, Header, Request, File, UploadFile, Form
-from fastapi.responses import RedirectResponse, JSONResponse, StreamingResponse
+from fastapi import FastAPI, Depends, HTTPException, Header, Request, File, UploadFile, Form, BackgroundTasks
+from fastapi.responses import RedirectResponse, JSONResponse, StreamingResponse, Response
 from pydantic import BaseModel
 from typing import Optional
+from contextlib import asynccontextmanager
+from cachetools import TTLCache
 import os
-import requests
+import json
+import asyncio
+import threading
+import httpx
 import jwt
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 import google.generativeai as genai
 from uuid import UUID
 from supabase import create_client, Client
 import io
+import wave
 import base64
+import hashlib
 from PIL import Image
-import tempfile
-from groq import Groq
-from llm_res import generate_advisory
-# For text-to-speech
+from groq import AsyncGroq
+from llm_res import generate_advisory_async
+# For text-to-speech (gTTS fallback when Piper is not configured)
 from gtts import gTTS
 
 # =========================================================
@@ -45,25 +51,73 @@ GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 GENAI_MODEL = "gemini-flash-latest"
 GENAI_VISION_MODEL = "gemini-1.5-flash"
 
+SYSTEM_PROMPT = """You are a friendly and helpful agriculture AI assistant.
+- Be concise but clear.
+- Do not prefix your answers with "Bot:" or "AI:".
+- Respond naturally, like a chat conversation.
+- Focus on agricultural advice, farming tips, and crop management.
+- You have access to specialized agricultural knowledge that provides solutions to common farming problems.
+- Use the provided advisory information to give accurate and helpful responses.
+- If the advisory information is relevant to the user's question, incorporate it naturally into your response.
+- If asked something unclear, politely ask for clarification.
+"""
+
+PIPER_VOICE_PATH = os.getenv("PIPER_VOICE_PATH")  # e.g. en_US-lessac-medium.onnx
+
 GOOGLE_ANDROID_CLIENT_ID = os.getenv("GOOGLE_ANDROID_CLIENT_ID")
 REDIRECT_URI = os.getenv("REDIRECT_URI_ANDROID", "http://127.0.0.1:8000/auth/callback")
 
-client = Groq(api_key=os.getenv("GROQ_API"))
+client = AsyncGroq(api_key=os.getenv("GROQ_API"))
 
 # Google Generative AI init
 if GOOGLE_API_KEY:
     genai.configure(api_key=GOOGLE_API_KEY)
     model = genai.GenerativeModel(GENAI_MODEL)
     vision_model = genai.GenerativeModel(GENAI_MODEL)
+    # Chat model with a fixed system instruction, so only the turns change between requests
+    chat_model = genai.GenerativeModel(GENAI_MODEL, system_instruction=SYSTEM_PROMPT)
 else:
     model = None
     vision_model = None
+    chat_model = None
+
+# Local Piper TTS init (falls back to gTTS when no voice model is configured)
+if PIPER_VOICE_PATH:
+    from piper.voice import PiperVoice
+    piper_voice = PiperVoice.load(PIPER_VOICE_PATH)
+    TTS_MEDIA_TYPE, TTS_FILENAME = "audio/wav", "speech.wav"
+else:
+    piper_voice = None
+    TTS_MEDIA_TYPE, TTS_FILENAME = "audio/mpeg", "speech.mp3"
 
 # =========================================================
 # FastAPI App Init
 # =========================================================
-app = FastAPI()
+# Shared keep-alive pool for outbound HTTP calls (e.g. Google token verification)
+http_client = httpx.AsyncClient(
+    timeout=10,
+    limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await http_client.aclose()
+
+app = FastAPI(lifespan=lifespan)
 MAX_RECENT_MESSAGES = int(os.getenv("MAX_RECENT_MESSAGES", "10"))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+# /message/add may carry both an audio and an image upload plus form fields
+MAX_REQUEST_BYTES = 2 * MAX_UPLOAD_BYTES + 64 * 1024
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+@app.middleware("http")
+async def limit_request_size(request: Request, call_next):
+    """Reject oversized bodies from Content-Length before they are parsed."""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_REQUEST_BYTES:
+        return JSONResponse(status_code=413, content={"detail": "Request body too large"})
+    return await call_next(request)
 
 # =========================================================
 # Helpers (Supabase, JWT, Common Functions)
@@ -80,6 +134,21 @@ def check_resp(resp, raise_on_missing: bool = True):
         return None
     return resp.data
 
+async def execute_async(query):
+    """Run a blocking supabase-py query builder's execute() off the event loop."""
+    return await asyncio.to_thread(query.execute)
+
+async def read_capped(upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> bytes:
+    """Read an uploaded file in chunks, failing with 413 once it exceeds max_bytes."""
+    if upload.size is not None and upload.size > max_bytes:
+        raise HTTPException(status_code=413, detail="Uploaded file too large")
+    buf = bytearray()
+    while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+        buf.extend(chunk)
+        if len(buf) > max_bytes:
+            raise HTTPException(status_code=413, detail="Uploaded file too large")
+    return bytes(buf)
+
 def encode_jwt(payload: dict) -> str:
     token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
     if isinstance(token, bytes):
@@ -107,6 +176,10 @@ def decode_jwt_token(token: str):
 # =========================================================
 # Dependencies (Auth Middleware)
 # =========================================================
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "60"))
+_user_cache = TTLCache(maxsize=10_000, ttl=USER_CACHE_TTL)
+_user_cache_lock = threading.Lock()  # sync dependency, runs on threadpool workers
+
 def get_current_user(authorization: Optional[str] = Header(None)):
     if not authorization:
         raise HTTPException(status_code=401, detail="Authorization header missing")
@@ -119,11 +192,20 @@ def get_current_user(authorization: Optional[str] = Header(None)):
     user_id_str = payload.get("sub")
     if not user_id_str:
         raise HTTPException(status_code=401, detail="Invalid token payload")
+    user_id = int(user_id_str)
+
+    # The JWT is already verified; only re-read the user row once the cache entry expires
+    with _user_cache_lock:
+        cached = _user_cache.get(user_id)
+    if cached is not None:
+        return cached
 
-    resp = supabase.table("users").select("*").eq("id", int(user_id_str)).maybe_single().execute()
+    resp = supabase.table("users").select("*").eq("id", user_id).maybe_single().execute()
     data = check_resp(resp, raise_on_missing=False)
     if not data:
         raise HTTPException(status_code=401, detail="User not found")
+    with _user_cache_lock:
+        _user_cache[user_id] = data
     return data
 
 # =========================================================
@@ -139,25 +221,16 @@ class GoogleSignInPayload(BaseModel):
 # =========================================================
 # Audio Transcription Helper (Whisper)
 # =========================================================
-def transcribe_audio_whisper(audio_bytes: bytes) -> str:
+async def transcribe_audio_whisper(audio_bytes: bytes) -> str:
     """
     Transcribe audio using Groq Whisper model.
     """
     try:
-        # Save audio to a temporary WAV file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_audio:
-            temp_audio.write(audio_bytes)
-            temp_audio_path = temp_audio.name
-
-        # Call Groq Whisper model
-        with open(temp_audio_path, "rb") as audio_file:
-            transcription = client.audio.transcriptions.create(
-                file=audio_file,
-                model="whisper-large-v3"
-            )
-
-        # Clean up
-        os.unlink(temp_audio_path)
+        # Call Groq Whisper model with the in-memory audio
+        transcription = await client.audio.transcriptions.create(
+            file=("audio.wav", io.BytesIO(audio_bytes), "audio/wav"),
+            model="whisper-large-v3"
+        )
 
         # Return transcription text
         return transcription.text
@@ -170,9 +243,15 @@ def transcribe_audio_whisper(audio_bytes: bytes) -> str:
 # =========================================================
 def text_to_speech(text: str) -> bytes:
     """
-    Convert text to speech using gTTS
+    Convert text to speech using local Piper (WAV) or gTTS (MP3)
     """
     try:
+        if piper_voice:
+            audio_fp = io.BytesIO()
+            with wave.open(audio_fp, "wb") as wav_file:
+                piper_voice.synthesize(text, wav_file)
+            return audio_fp.getvalue()
+
         tts = gTTS(text=text, lang='en', slow=False)
         audio_fp = io.BytesIO()
         tts.write_to_fp(audio_fp)
@@ -184,7 +263,22 @@ def text_to_speech(text: str) -> bytes:
 # =========================================================
 # Image Analysis Helper
 # =========================================================
-def analyze_image_with_gemini(image_bytes: bytes, prompt: str = None) -> str:
+MAX_IMAGE_SIDE = 1024
+
+def prepare_image(image_bytes: bytes) -> dict:
+    """
+    Decode, downscale and re-encode an uploaded image as JPEG for Gemini.
+    CPU-bound, so callers run it in a worker thread.
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    image.draft("RGB", (MAX_IMAGE_SIDE, MAX_IMAGE_SIDE))  # JPEG only: decode at reduced scale
+    image = image.convert("RGB")
+    image.thumbnail((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE), Image.Resampling.LANCZOS)
+    out = io.BytesIO()
+    image.save(out, format="JPEG", quality=90)
+    return {"mime_type": "image/jpeg", "data": out.getvalue()}
+
+async def analyze_image_with_gemini(image_bytes: bytes, prompt: str = None) -> str:
     """
     Analyze image using Gemini Vision API
     Returns short diagnosis/classification
@@ -193,8 +287,8 @@ def analyze_image_with_gemini(image_bytes: bytes, prompt: str = None) -> str:
         raise HTTPException(status_code=500, detail="Vision model not configured")
     
     try:
-        # Convert bytes to PIL Image
-        image = Image.open(io.BytesIO(image_bytes))
+        # Decode and downscale off the event loop
+        image = await asyncio.to_thread(prepare_image, image_bytes)
         
         # Default prompt for plant disease detection
         if not prompt:
@@ -202,7 +296,7 @@ def analyze_image_with_gemini(image_bytes: bytes, prompt: str = None) -> str:
             If it's a disease, name the disease. If it's healthy, say 'Healthy Plant'.
             Do not provide explanations, just the diagnosis."""
         
-        response = vision_model.generate_content([prompt, image])
+        response = await vision_model.generate_content_async([prompt, image])
         diagnosis = response.text.strip()
         
         return diagnosis
@@ -210,7 +304,7 @@ def analyze_image_with_gemini(image_bytes: bytes, prompt: str = None) -> str:
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Image analysis failed: {str(e)}")
 
-def get_detailed_explanation(diagnosis: str) -> str:
+async def get_detailed_explanation(diagnosis: str) -> str:
     """
     Get detailed explanation for the diagnosis using regular Gemini
     """
@@ -227,7 +321,7 @@ def get_detailed_explanation(diagnosis: str) -> str:
         
         Keep it concise and farmer-friendly (2-3 paragraphs)."""
         
-        response = model.generate_content(prompt)
+        response = await model.generate_content_async(prompt)
         return response.text.strip()
     
     except Exception:
@@ -237,10 +331,10 @@ def get_detailed_explanation(diagnosis: str) -> str:
 # Auth Routes
 # =========================================================
 @app.post("/auth/google")
-def auth_google(payload: GoogleSignInPayload):
+async def auth_google(payload: GoogleSignInPayload):
     # 1. Verify the token with Google
-    verify_url = f"https://oauth2.googleapis.com/tokeninfo?id_token={payload.id_token}"
-    google_resp = requests.get(verify_url)
+    verify_url = "https://oauth2.googleapis.com/tokeninfo"
+    google_resp = await http_client.get(verify_url, params={"id_token": payload.id_token})
     if google_resp.status_code != 200:
         raise HTTPException(status_code=400, detail="Invalid Google ID token")
 
@@ -251,12 +345,12 @@ def auth_google(payload: GoogleSignInPayload):
         raise HTTPException(status_code=400, detail="Google account missing email")
 
     # 2. Check if user exists in Supabase, else create
-    check_user_resp = supabase.table("users").select("*").eq("email", email).maybe_single().execute()
+    check_user_resp = await execute_async(supabase.table("users").select("*").eq("email", email).maybe_single())
     existing = check_resp(check_user_resp, raise_on_missing=False)
     if not existing:
-        insert_resp = supabase.table("users").insert({
+        insert_resp = await execute_async(supabase.table("users").insert({
             "name": name, "email": email, "role": "user"
-        }).execute()
+        }))
         inserted = check_resp(insert_resp)
         if not inserted:
             raise HTTPException(status_code=500, detail="Failed to create user")
@@ -286,10 +380,17 @@ def get_env_vars():
     return "App is Running Fine"
 
 @app.get("/sessions")
-def list_sessions(user=Depends(get_current_user)):
-    resp = supabase.table("sessions").select("*").eq("user_id", user["id"]).order("created_at", desc=True).execute()
-    data = check_resp(resp, raise_on_missing=False)
-    return data or []
+def list_sessions(request: Request, user=Depends(get_current_user)):
+    resp = supabase.table("sessions").select("id, user_id, user_email, title, created_at").eq("user_id", user["id"]).order("created_at", desc=True).execute()
+    data = check_resp(resp, raise_on_missing=False) or []
+
+    # Clients revalidate with If-None-Match and skip the body when nothing changed
+    body = json.dumps(data, sort_keys=True, default=str)
+    etag = '"' + hashlib.blake2b(body.encode("utf-8"), digest_size=16).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @app.get("/messages/{session_id}")
 def get_messages(session_id: UUID, user=Depends(get_current_user)):
@@ -312,8 +413,8 @@ async def transcribe_audio(
     """
     Transcribe audio file to text using Whisper
     """
-    audio_bytes = await audio.read()
-    transcription = transcribe_audio_whisper(audio_bytes)
+    audio_bytes = await read_capped(audio)
+    transcription = await transcribe_audio_whisper(audio_bytes)
     return {"transcription": transcription}
 
 # =========================================================
@@ -330,8 +431,8 @@ def generate_speech(
     audio_bytes = text_to_speech(text)
     return StreamingResponse(
         io.BytesIO(audio_bytes),
-        media_type="audio/mpeg",
-        headers={"Content-Disposition": "attachment; filename=speech.mp3"}
+        media_type=TTS_MEDIA_TYPE,
+        headers={"Content-Disposition": f"attachment; filename={TTS_FILENAME}"}
     )
 
 # =========================================================
@@ -347,11 +448,11 @@ async def analyze_image(
     """
     Analyze image and return diagnosis + detailed explanation
     """
-    image_bytes = await image.read()
+    image_bytes = await read_capped(image)
     
     # Get short diagnosis
     try:
-        diagnosis = analyze_image_with_gemini(image_bytes)
+        diagnosis = await analyze_image_with_gemini(image_bytes)
     except Exception as e:
         print("Image analysis failed:", e)
         raise HTTPException(status_code=500, detail="Image analysis failed")
@@ -367,15 +468,15 @@ async def analyze_image(
         
         if model:
             try:
-                response = model.generate_content(prompt)
+                response = await model.generate_content_async(prompt)
                 detailed_response = response.text.strip()
             except:
-                detailed_response = get_detailed_explanation(diagnosis)
+                detailed_response = await get_detailed_explanation(diagnosis)
         else:
-            detailed_response = get_detailed_explanation(diagnosis)
+            detailed_response = await get_detailed_explanation(diagnosis)
     else:
         # Get detailed explanation
-        detailed_response = get_detailed_explanation(diagnosis)
+        detailed_response = await get_detailed_explanation(diagnosis)
     
     return {
         "diagnosis": diagnosis,
@@ -383,6 +484,110 @@ async def analyze_image(
         "session_id": session_id
     }
 
+# =========================================================
+# Message Helpers (Session, Prompt, Persistence)
+# =========================================================
+async def generate_session_title(message: str) -> Optional[str]:
+    """Ask Gemini for a short session title; None if no model or the call fails."""
+    if not model:
+        return None
+    try:
+        title_prompt = f"Give a short and clear 3–5 word title for this new conversation:\n\nUser: {message}"
+        title_resp = await model.generate_content_async(title_prompt)
+        return title_resp.text.strip() or None
+    except Exception:
+        return None
+
+async def resolve_session(session_id_uuid: Optional[UUID], message: str, user: dict, generate_title: bool = True):
+    """
+    Create a new session or verify ownership of an existing one.
+    Returns (session_id, new_session_created, recent_messages) where recent_messages
+    holds the history before the current message, oldest first.
+    """
+    if not session_id_uuid:
+        title = message[:40] if message else "New Chat"
+
+        if generate_title:
+            title = await generate_session_title(message) or title
+
+        session_insert_resp = await execute_async(supabase.table("sessions").insert({
+            "user_id": user["id"],
+            "user_email": user["email"],
+            "title": title,
+            "summary": ""
+        }))
+
+        inserted = check_resp(session_insert_resp)
+        if not inserted:
+            raise HTTPException(status_code=500, detail="Failed to create session")
+        return inserted[0]["id"], True, []
+
+    # The messages table is the source of truth for history; read it alongside the ownership check
+    session_resp, messages_resp = await asyncio.gather(
+        execute_async(
+            supabase.table("sessions")
+            .select("user_id")
+            .eq("id", str(session_id_uuid))
+            .maybe_single()
+        ),
+        execute_async(
+            supabase.table("messages")
+            .select("sender, message")
+            .eq("session_id", str(session_id_uuid))
+            .order("timestamp", desc=True)
+            .limit(MAX_RECENT_MESSAGES)
+        ),
+    )
+    session_data = check_resp(session_resp, raise_on_missing=False)
+    if not session_data or session_data.get("user_id") != user["id"]:
+        raise HTTPException(status_code=403, detail="Not your session")
+    recent_messages = list(reversed(check_resp(messages_resp, raise_on_missing=False) or []))
+    return session_id_uuid, False, recent_messages
+
+def history_to_contents(recent_messages: list) -> list:
+    """Convert stored turns into Gemini chat history, merging consecutive same-role turns."""
+    contents = []
+    for m in recent_messages:
+        role = "user" if m["sender"] == "user" else "model"
+        if contents and contents[-1]["role"] == role:
+            contents[-1]["parts"].append(m["message"])
+        else:
+            contents.append({"role": role, "parts": [m["message"]]})
+    return contents
+
+def start_chat(recent_messages: list, advisory: str, message: str):
+    """
+    Start a Gemini chat over the session history and return (chat, latest_turn).
+    The advisory is only attached to the latest turn, so the system instruction and
+    earlier turns form a stable prefix across requests.
+    """
+    history = history_to_contents(recent_messages)
+    # Gemini expects alternating roles; fold a dangling user turn into the new one
+    pending = history.pop()["parts"] if history and history[-1]["role"] == "user" else []
+
+    advisory_context = f"Specialized Agricultural Advisory:\n{advisory}\n\n" if advisory else ""
+    latest_turn = "\n".join(pending + [advisory_context + f"User's latest question: {message}"])
+    return chat_model.start_chat(history=history), latest_turn
+
+def clean_reply(text: str) -> str:
+    """Strip whitespace and a leading "Assistant:" the model sometimes adds."""
+    reply = text.strip()
+    if reply.lower().startswith("assistant:"):
+        reply = reply.split(":", 1)[1].strip()
+    return reply
+
+def new_message_row(session_id, sender: str, message: str) -> dict:
+    return {
+        "session_id": str(session_id),
+        "sender": sender,
+        "message": message,
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+
+async def save_exchange(user_message: dict, bot_message: dict):
+    """Persist the user message and bot reply with a single batched insert."""
+    await execute_async(supabase.table("messages").insert([user_message, bot_message]))
+
 # =========================================================
 # Message & Bot Reply Route (Enhanced)
 # =========================================================
@@ -401,13 +606,13 @@ async def add_message(
     
     # Handle audio input
     if audio:
-        audio_bytes = await audio.read()
-        message = transcribe_audio_whisper(audio_bytes)
+        audio_bytes = await read_capped(audio)
+        message = await transcribe_audio_whisper(audio_bytes)
     
     # Handle image input
     if image:
-        image_bytes = await image.read()
-        diagnosis = analyze_image_with_gemini(image_bytes)
+        image_bytes = await read_capped(image)
+        diagnosis = await analyze_image_with_gemini(image_bytes)
         
         # If there's also a text message, treat it as a follow-up question
         if message:
@@ -420,131 +625,60 @@ async def add_message(
             
             if model:
                 try:
-                    response = model.generate_content(prompt)
+                    response = await model.generate_content_async(prompt)
                     detailed_response += response.text.strip()
                 except:
-                    detailed_response += generate_advisory(diagnosis)
+                    detailed_response += await generate_advisory_async(diagnosis)
             else:
-                detailed_response += generate_advisory(diagnosis)
+                detailed_response += await generate_advisory_async(diagnosis)
             
             message = f"[Image uploaded] {message}"
             bot_reply = detailed_response
         else:
             message = "[Image uploaded]"
-            bot_reply = generate_advisory(diagnosis)
+            bot_reply = await generate_advisory_async(diagnosis)
     
     if not message:
         raise HTTPException(status_code=400, detail="No message, audio, or image provided")
     
     # --- Session Handling ---
-    session_id_uuid = UUID(session_id) if session_id else None
-    new_session_created = False
-    session_data = None
-
-    if not session_id_uuid:
-        new_session_created = True
-        title = message[:40] if message else "New Chat"
-
-        if model and not image:  # Don't generate title for image messages
-            try:
-                title_prompt = f"Give a short and clear 3–5 word title for this new conversation:\n\nUser: {message}"
-                title_resp = model.generate_content(title_prompt)
-                title = title_resp.text.strip()
-            except Exception:
-                pass
+    user_message = new_message_row(session_id, "user", message)
 
-        session_insert_resp = supabase.table("sessions").insert({
-            "user_id": user["id"],
-            "user_email": user["email"],
-            "title": title,
-            "summary": ""
-        }).execute()
-
-        inserted = check_resp(session_insert_resp)
-        if not inserted:
-            raise HTTPException(status_code=500, detail="Failed to create session")
-        session_id_uuid = inserted[0]["id"]
-        session_data = inserted[0]
+    # The advisory only depends on the message, so start it before the session work
+    advisory_task = asyncio.create_task(generate_advisory_async(message)) if not image else None
 
-    else:
-        session_resp = (
-            supabase.table("sessions")
-            .select("user_id, summary")
-            .eq("id", str(session_id_uuid))
-            .maybe_single()
-            .execute()
+    try:
+        # Don't generate title for image messages
+        session_id_uuid, new_session_created, recent_messages = await resolve_session(
+            UUID(session_id) if session_id else None, message, user, generate_title=not image
         )
-        session_data = check_resp(session_resp, raise_on_missing=False)
-        if not session_data or session_data.get("user_id") != user["id"]:
-            raise HTTPException(status_code=403, detail="Not your session")
-
-    # --- Save User Message ---
-    supabase.table("messages").insert({
-        "session_id": str(session_id_uuid),
-        "sender": "user",
-        "message": message
-    }).execute()
+    except BaseException:
+        if advisory_task:
+            advisory_task.cancel()
+        raise
+    user_message["session_id"] = str(session_id_uuid)
 
     # --- Generate Bot Reply (if not already generated from image) ---
     if not image:
-        # Prepare conversation history
-        messages_resp = (
-            supabase.table("messages")
-            .select("*")
-            .eq("session_id", str(session_id_uuid))
-            .order("timestamp", desc=True)
-            .limit(MAX_RECENT_MESSAGES)
-            .execute()
-        )
-        result = generate_advisory(message)
-        recent_messages = check_resp(messages_resp, raise_on_missing=False) or []
-        recent_messages = list(reversed(recent_messages))
-
-        SYSTEM_PROMPT = """You are a friendly and helpful agriculture AI assistant.
-- Be concise but clear.
-- Do not prefix your answers with "Bot:" or "AI:".
-- Respond naturally, like a chat conversation.
-- Focus on agricultural advice, farming tips, and crop management.
-- You have access to specialized agricultural knowledge that provides solutions to common farming problems.
-- Use the provided advisory information to give accurate and helpful responses.
-- If the advisory information is relevant to the user's question, incorporate it naturally into your response.
-- If asked something unclear, politely ask for clarification.
-"""
-
-        history_text = "\n".join(
-            [("User" if m["sender"] == "user" else "Assistant") + ": " + m["message"]
-             for m in recent_messages]
-        )
-
-        # Include the advisory result in the prompt
-        advisory_context = f"\n\nSpecialized Agricultural Advisory:\n{result}" if result else ""
-
-        prompt = SYSTEM_PROMPT + "\n\nConversation so far:\n" + history_text + \
-                 advisory_context + f"\n\nUser's latest question: {message}\n\nAssistant:"
+        result = await advisory_task
 
         bot_reply = f"[local fallback reply] You said: {message}"
-        if model:
+        if chat_model:
             try:
-                bot_reply = model.generate_content(prompt).text.strip()
-
-                if bot_reply.lower().startswith("assistant:"):
-                    bot_reply = bot_reply.split(":", 1)[1].strip()
+                chat, latest_turn = start_chat(recent_messages, result, message)
+                bot_reply = clean_reply((await chat.send_message_async(latest_turn)).text)
 
             except Exception as e:
                 print(f"Gemini API call failed: {e}")
 
-    # --- Save Bot Reply ---
-    supabase.table("messages").insert({
-        "session_id": str(session_id_uuid),
-        "sender": "bot",
-        "message": bot_reply
-    }).execute()
+    # --- Save User Message + Bot Reply ---
+    await save_exchange(user_message, new_message_row(session_id_uuid, "bot", bot_reply))
 
     # --- Generate audio response if audio input was provided ---
     audio_response = None
     if audio:
         try:
-            audio_bytes = text_to_speech(bot_reply)
+            audio_bytes = await asyncio.to_thread(text_to_speech, bot_reply)
             audio_response = base64.b64encode(audio_bytes).decode('utf-8')
         except:
             pass  # If TTS fails, just return text
@@ -553,9 +687,97 @@ async def add_message(
         "session_id": str(session_id_uuid),
         "reply": bot_reply,
         "audio_reply": audio_response,  # Base64 encoded audio
+        "audio_mime": TTS_MEDIA_TYPE if audio_response else None,
         "new_session": new_session_created
     }
 
+# =========================================================
+# Streaming Message Route (Server-Sent Events)
+# =========================================================
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/message/stream")
+async def stream_message(
+    background_tasks: BackgroundTasks,
+    session_id: Optional[str] = Form(None),
+    message: str = Form(...),
+    user=Depends(get_current_user)
+):
+    """
+    Text-only variant of /message/add that streams the bot reply as it is generated.
+    Emits a `session` event, then `token` events, then `done` (or `error` if Gemini
+    fails mid-reply); the exchange is saved only when the reply finished streaming.
+    The `session` event is sent before waiting for the RAG advisory, which still
+    dominates time-to-first-token. A new session starts with a placeholder title
+    and gets its generated title once the reply has streamed.
+    """
+    user_message = new_message_row(session_id, "user", message)
+    advisory_task = asyncio.create_task(generate_advisory_async(message))
+    title_task = None if session_id else asyncio.create_task(generate_session_title(message))
+    try:
+        session_id_uuid, new_session_created, recent_messages = await resolve_session(
+            UUID(session_id) if session_id else None, message, user, generate_title=False
+        )
+    except BaseException:
+        advisory_task.cancel()
+        if title_task:
+            title_task.cancel()
+        raise
+    user_message["session_id"] = str(session_id_uuid)
+
+    reply_parts = []
+    completed = False
+
+    async def stream_reply():
+        nonlocal completed
+        yield sse_event("session", {"session_id": str(session_id_uuid), "new_session": new_session_created})
+        try:
+            result = await advisory_task
+        except Exception as e:
+            # Headers are already sent, so answer without the advisory instead of failing
+            print(f"Advisory generation failed: {e}")
+            result = None
+        if chat_model:
+            try:
+                chat, latest_turn = start_chat(recent_messages, result, message)
+                async for chunk in await chat.send_message_async(latest_turn, stream=True):
+                    if chunk.text:
+                        reply_parts.append(chunk.text)
+                        yield sse_event("token", {"text": chunk.text})
+            except Exception as e:
+                print(f"Gemini API call failed: {e}")
+                yield sse_event("error", {"detail": "Reply generation failed"})
+                return
+        if not reply_parts:
+            reply_parts.append(f"[local fallback reply] You said: {message}")
+            yield sse_event("token", {"text": reply_parts[0]})
+        completed = True
+        yield sse_event("done", {})
+
+    async def save_streamed_reply():
+        if not advisory_task.done():
+            advisory_task.cancel()  # client disconnected before the reply was generated
+        if title_task:
+            title = await title_task
+            if title:
+                await execute_async(
+                    supabase.table("sessions").update({"title": title}).eq("id", str(session_id_uuid))
+                )
+        if not completed:
+            return  # client disconnected or Gemini failed; don't store a partial reply
+        bot_reply = clean_reply("".join(reply_parts))
+        await save_exchange(user_message, new_message_row(session_id_uuid, "bot", bot_reply))
+
+    background_tasks.add_task(save_streamed_reply)
+    return StreamingResponse(stream_reply(), media_type="text/event-stream")
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("app:app", host="0.0.0.0", port=7860)
\ No newline at end of file
+    # uvicorn[standard] picks uvloop + httptools automatically when installed
+    uvicorn.run(
+        "server:app",
+        host="0.0.0.0",
+        port=7860,
+        workers=int(os.getenv("WEB_CONCURRENCY", "4"))
+    )
\ No newline at end of file
@@ -0,0 +1,37 @@
+import os
+import threading
+import torch
+from sentence_transformers import SentenceTransformer
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+# EMBEDDING_BACKEND=onnx loads the int8-quantized ONNX export shipped with the model
+# (needs sentence-transformers[onnx]); pick the file matching the CPU (avx2 / avx512_vnni).
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+EMBEDDING_ONNX_FILE = os.getenv("EMBEDDING_ONNX_FILE", "onnx/model_quint8_avx2.onnx")
+
+def load_encoder():
+    """Load the sentence embedding model in inference mode."""
+    if EMBEDDING_BACKEND == "onnx":
+        return SentenceTransformer(MODEL_NAME, backend="onnx", model_kwargs={"file_name": EMBEDDING_ONNX_FILE})
+    model = SentenceTransformer(MODEL_NAME)
+    model.eval()
+    return model
+
+# Single model instance shared by the FAISS pipeline and the quantum reranker
+_encoder = None
+_encoder_lock = threading.Lock()
+
+def get_encoder():
+    """Return the shared embedding model, loading it on first use."""
+    global _encoder
+    if _encoder is None:
+        with _encoder_lock:
+            if _encoder is None:
+                _encoder = load_encoder()
+    return _encoder
+
+def encode(texts, **kwargs):
+    """Encode texts into numpy embeddings with the shared model, without autograd tracking."""
+    with torch.inference_mode():
+        return get_encoder().encode(texts, convert_to_numpy=True, show_progress_bar=False, **kwargs)
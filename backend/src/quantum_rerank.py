@@ -1,32 +1,35 @@
 import numpy as np
 import joblib
-from sentence_transformers import SentenceTransformer
-from qiskit import QuantumCircuit
-from qiskit_aer import AerSimulator
+from src.embeddings import encode
 from src.utils import reduced_to_angles
 
-# Load embedding model
-model = SentenceTransformer("all-MiniLM-L6-v2")
+N_QUBITS = 6
 
-# Initialize quantum simulator
-backend = AerSimulator(method="statevector")
+def _cnot_chain_permutation(n_qubits=N_QUBITS):
+    """Index map applying the chained CNOTs (0->1, 1->2, ...) to a statevector."""
+    perm = np.empty(2 ** n_qubits, dtype=np.int64)
+    for b in range(2 ** n_qubits):
+        out = b
+        for i in range(n_qubits - 1):
+            if (out >> i) & 1:
+                out ^= 1 << (i + 1)
+        perm[out] = b
+    return perm
 
-def build_circuit(angles):
-    """Build a 6-qubit circuit with RY rotations and chained CNOT entanglement."""
-    qc = QuantumCircuit(6)
-    for i, a in enumerate(angles):
-        qc.ry(float(a), i)
-    for i in range(5):  # 0->1, 1->2, ... 4->5
-        qc.cx(i, i + 1)
-    qc.save_statevector()
-    return qc
+_CNOT_PERM = _cnot_chain_permutation()
 
 def get_statevector(angles):
-    """Simulate and return the 6-qubit statevector."""
-    qc = build_circuit(angles)
-    job = backend.run(qc)
-    result = job.result()
-    return result.get_statevector(qc)
+    """Return the 6-qubit statevector of the RY + chained CNOT circuit.
+
+    RY on |0> gives the real state [cos(a/2), sin(a/2)], so the product state is
+    a Kronecker product (qubit 0 least significant, as in Qiskit) and the CNOT
+    chain is a fixed permutation of its amplitudes.
+    """
+    half = np.asarray(angles, dtype=np.float32) / 2
+    sv = np.ones(1, dtype=np.float32)
+    for c, s in zip(np.cos(half), np.sin(half)):
+        sv = np.kron(np.array([c, s], dtype=np.float32), sv)
+    return sv[_CNOT_PERM]
 
 def fidelity(vec1, vec2):
     """Quantum state fidelity (similarity between two statevectors)."""
@@ -37,12 +40,18 @@ def quantum_similarity(query_embedding, pca_model, mins_val, maxs_val, doc_svs):
     reduced = pca_model.transform(query_embedding)
     angles = reduced_to_angles(reduced[0], mins_val, maxs_val)
     query_sv = get_statevector(angles)
-    scores = [fidelity(query_sv, doc_sv) for doc_sv in doc_svs]
-    return np.array(scores)
+    # Doc statevectors are stored as float16; upcast only the candidate slice
+    cand = np.asarray(doc_svs).astype(np.float32, copy=False)
+    scores = np.abs(cand @ np.conj(query_sv)) ** 2
+    return scores
 
-def quantum_rerank(query, texts, candidate_doc_statevectors, top_k=5, pca_model=None, mins_val=None, maxs_val=None):
+def quantum_rerank(query, texts, candidate_doc_statevectors, top_k=5, pca_model=None, mins_val=None, maxs_val=None, query_embedding=None):
     """Rerank candidate texts using quantum fidelity similarity."""
-    emb = model.encode([query])
+    emb = query_embedding if query_embedding is not None else encode([query], normalize_embeddings=True)
     scores = quantum_similarity(emb, pca_model, mins_val, maxs_val, candidate_doc_statevectors)
-    top_idx = np.argsort(scores)[::-1][:top_k]
+    if top_k < len(scores):
+        top_idx = np.argpartition(-scores, top_k)[:top_k]
+    else:
+        top_idx = np.arange(len(scores))
+    top_idx = top_idx[np.argsort(-scores[top_idx])]
     return [(texts[i], float(scores[i])) for i in top_idx]
@@ -1,38 +1,120 @@
+import asyncio
 import numpy as np
 import faiss
-import json
-from sentence_transformers import SentenceTransformer
+from src.embeddings import encode, get_encoder
 from src.quantum_rerank import quantum_rerank
+from src.semantic_cache import SemanticCache
+from src.text_store import TextStore
 import joblib
 
-# Load FAISS index and dataset texts
-index = faiss.read_index("data/faiss_index_384.index")
-model = SentenceTransformer("all-MiniLM-L6-v2")
+# Load the shared embedding model up front rather than on the first request
+get_encoder()
+
+# Load FAISS ANN index (built from faiss_index_384.index by build_faiss_index.py)
+HNSW_EF_SEARCH = 64
+IVF_NPROBE = 8
+index = faiss.read_index("data/faiss_hnsw_384.index")
+if isinstance(index, faiss.IndexHNSW):
+    index.hnsw.efSearch = HNSW_EF_SEARCH
+elif isinstance(index, faiss.IndexIVF):
+    index.nprobe = IVF_NPROBE
 # Load PCA + metadata + doc statevectors
 pca = joblib.load("data/pca_6.pkl")
 mins = np.load("data/pca_mins.npy")
 maxs = np.load("data/pca_maxs.npy")
-doc_statevectors = np.load("data/doc_statevectors.npy", mmap_mode='r')
+# Real-valued float16 copy of doc_statevectors.npy (see convert_statevectors.py)
+doc_statevectors = np.load("data/doc_statevectors_f16.npy", mmap_mode='r')
+
+# Advisory texts, memory-mapped (built from qa_dataset_final.jsonl by build_text_store.py)
+texts = TextStore("data/texts_offsets.npy", "data/texts.bin")
+
+# Micro-batching settings for concurrent requests
+MAX_BATCH = 16
+BATCH_WAIT_S = 0.005
+
+_queue = None
+_worker = None
 
-# Load your advisory texts (each line = one record)
-texts = []
-with open("data/qa_dataset_final.jsonl", "r", encoding="utf-8") as f:
-    for line in f:
-        data = json.loads(line)
-        texts.append(data["text"])
+# Near-duplicate queries reuse the previous reranked results
+semantic_cache = SemanticCache(dim=index.d)
+
+def encode_queries(queries):
+    """Encode a list of queries into L2-normalized float32 embeddings."""
+    return encode(queries, normalize_embeddings=True)
+
+def search_batch(queries, top_n=20):
+    """Encode and search a batch of queries with a single FAISS call."""
+    embs = encode_queries(queries)
+    scores, idx = index.search(embs, top_n)
+    return embs, scores, idx
 
 def get_faiss_top(query, top_n=20):
     """Retrieve top_n most similar embeddings from FAISS."""
-    emb = model.encode([query])
-    emb = emb / np.linalg.norm(emb)
-    emb = np.array(emb, dtype=np.float32)
-    scores, idx = index.search(emb, top_n)
+    _, scores, idx = search_batch([query], top_n)
     candidate_doc_statevectors = doc_statevectors[idx[0]]
     return idx[0], scores[0], candidate_doc_statevectors
 
+def rerank_candidates(query, idx, top_k=5, query_embedding=None):
+    """Quantum rerank the FAISS candidates given by idx."""
+    candidate_texts = [texts[i] for i in idx]
+    candidate_doc_statevectors = doc_statevectors[idx]
+    return quantum_rerank(query, candidate_texts, candidate_doc_statevectors, top_k=top_k, pca_model=pca, mins_val=mins, maxs_val=maxs, query_embedding=query_embedding)
+
+def retrieve_batch(queries, top_ks, top_n=20):
+    """Pipeline for a batch of queries: semantic cache, else FAISS + quantum rerank."""
+    embs = encode_queries(queries)
+    results = []
+    for emb, top_k in zip(embs, top_ks):
+        cached = semantic_cache.lookup(emb)
+        results.append(cached[:top_k] if cached is not None and len(cached) >= top_k else None)
+
+    misses = [i for i, r in enumerate(results) if r is None]
+    if misses:
+        _, idx = index.search(embs[misses], top_n)
+        for i, row in zip(misses, idx):
+            results[i] = rerank_candidates(queries[i], row, top_k=top_ks[i], query_embedding=embs[i:i + 1])
+            semantic_cache.insert(embs[i], results[i])
+    return results
+
 def full_pipeline(query, top_k=5):
     """Complete pipeline: FAISS retrieval + Quantum rerank."""
-    idx, _, candidate_doc_statevectors = get_faiss_top(query)
-    candidate_texts = [texts[i] for i in idx]
-    final_results = quantum_rerank(query, candidate_texts, candidate_doc_statevectors, top_k=top_k, pca_model=pca, mins_val=mins, maxs_val=maxs)
-    return final_results
\ No newline at end of file
+    return retrieve_batch([query], [top_k])[0]
+
+async def _batch_worker():
+    """Drain pending queries in groups of up to MAX_BATCH and search them together."""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await _queue.get()]
+        deadline = loop.time() + BATCH_WAIT_S
+        while len(batch) < MAX_BATCH:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        queries = [query for query, _, _ in batch]
+        top_ks = [top_k for _, top_k, _ in batch]
+        try:
+            results = await asyncio.to_thread(retrieve_batch, queries, top_ks)
+        except Exception as e:
+            for _, _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            continue
+        for (_, _, fut), result in zip(batch, results):
+            if not fut.done():
+                fut.set_result(result)
+
+async def full_pipeline_async(query, top_k=5):
+    """Async pipeline: coalesces concurrent requests into one batched pipeline call."""
+    global _queue, _worker
+    if _worker is None or _worker.done():
+        _queue = asyncio.Queue()
+        _worker = asyncio.create_task(_batch_worker())
+
+    fut = asyncio.get_running_loop().create_future()
+    await _queue.put((query, top_k, fut))
+    return await fut
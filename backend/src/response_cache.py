@@ -0,0 +1,64 @@
+import hashlib
+import time
+import threading
+from collections import OrderedDict
+
+class ResponseCache:
+    """TTL cache for LLM responses keyed by a hash of the full request.
+
+    Uses Redis when redis_url is given (shared across workers), otherwise an
+    in-process LRU capped at max_entries.
+    """
+
+    def __init__(self, prefix, ttl=3600, max_entries=10_000, redis_url=None):
+        self.prefix = prefix
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._redis = None
+        if redis_url:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(redis_url, decode_responses=True)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(*parts):
+        """Hash the request parts (prompt, session id, ...) into a cache key."""
+        h = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            h.update(str(part).encode("utf-8"))
+            h.update(b"\x00")
+        return h.hexdigest()
+
+    async def get(self, key):
+        """Return the cached value, or None on a miss or backend error."""
+        if self._redis is not None:
+            try:
+                return await self._redis.get(self.prefix + key)
+            except Exception as e:
+                print(f"Response cache get failed: {e}")
+                return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    async def set(self, key, value):
+        """Store value; backend errors are logged and ignored."""
+        if self._redis is not None:
+            try:
+                await self._redis.set(self.prefix + key, value, ex=self.ttl)
+            except Exception as e:
+                print(f"Response cache set failed: {e}")
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
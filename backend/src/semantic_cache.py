@@ -0,0 +1,64 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+
+class SemanticCache:
+    """LRU cache keyed by query embedding, matched by cosine similarity.
+
+    Candidate entries are found with random-projection LSH (n_tables tables of
+    n_planes hyperplanes each) and then verified with an exact cosine check.
+    Embeddings are expected to be L2-normalized.
+    """
+
+    def __init__(self, dim=384, n_planes=16, n_tables=4, threshold=0.95, max_entries=10_000, seed=0):
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((n_tables, dim, n_planes)).astype(np.float32)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._tables = [{} for _ in range(n_tables)]
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _keys(self, emb):
+        bits = np.einsum("d,tdp->tp", emb, self.planes) > 0
+        return [row.tobytes() for row in bits]
+
+    def lookup(self, emb):
+        """Return the cached result for a near-duplicate embedding, or None."""
+        emb = np.asarray(emb, dtype=np.float32)
+        keys = self._keys(emb)
+        with self._lock:
+            candidates = set()
+            for table, key in zip(self._tables, keys):
+                candidates.update(table.get(key, ()))
+            best_id, best_sim = None, self.threshold
+            for entry_id in candidates:
+                sim = float(self._entries[entry_id][0] @ emb)
+                if sim >= best_sim:
+                    best_id, best_sim = entry_id, sim
+            if best_id is None:
+                return None
+            self._entries.move_to_end(best_id)
+            return self._entries[best_id][1]
+
+    def insert(self, emb, result):
+        """Store result under emb, evicting the least recently used entry if full."""
+        emb = np.array(emb, dtype=np.float32)
+        keys = self._keys(emb)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (emb, result, keys)
+            for table, key in zip(self._tables, keys):
+                table.setdefault(key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                old_id, (_, _, old_keys) = self._entries.popitem(last=False)
+                for table, key in zip(self._tables, old_keys):
+                    bucket = table[key]
+                    bucket.discard(old_id)
+                    if not bucket:
+                        del table[key]
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,30 @@
+import numpy as np
+
+class TextStore:
+    """Read-only list of UTF-8 texts backed by memory-mapped files.
+
+    offsets_path holds N+1 int64 byte offsets into the concatenated blob at
+    blob_path, so text i is blob[offsets[i]:offsets[i+1]]. Both files are
+    mmapped, so forked workers share the same pages.
+    """
+
+    def __init__(self, offsets_path, blob_path):
+        self.offsets = np.load(offsets_path, mmap_mode='r')
+        self.blob = np.memmap(blob_path, dtype=np.uint8, mode='r')
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.blob[start:end].tobytes().decode("utf-8")
+
+def write_text_store(texts, offsets_path, blob_path):
+    """Write texts in the TextStore format."""
+    encoded = [t.encode("utf-8") for t in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    np.save(offsets_path, offsets)
+    with open(blob_path, "wb") as f:
+        for b in encoded:
+            f.write(b)
@@ -2,14 +2,16 @@ import numpy as np
 
 def reduced_to_angles(z, mins, maxs):
     """Convert reduced PCA features into rotation angles in [0, π]."""
-    z = np.asarray(z)
-    denom = (maxs - mins)
+    denom = np.subtract(maxs, mins)
     denom[denom == 0] = 1e-12
-    scaled = (z - mins) / denom
-    return scaled * np.pi
+    angles = np.subtract(z, mins)
+    np.divide(angles, denom, out=angles)
+    np.multiply(angles, np.pi, out=angles)
+    return angles
 
 def l2_normalize_matrix(X):
-    """Normalize a matrix row-wise to unit length (L2 norm)."""
+    """Normalize a float matrix row-wise to unit length (L2 norm), in place."""
     norms = np.linalg.norm(X, axis=1, keepdims=True)
-    norms[norms == 0] = 1e-12
-    return X / norms
\ No newline at end of file
+    np.maximum(norms, 1e-12, out=norms)
+    X /= norms
+    return X
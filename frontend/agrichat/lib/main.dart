@@ -222,6 +222,7 @@ class ChatState extends ChangeNotifier {
         final botReply = data['reply'];
         final sid = data['session_id'];
         final audioReply = data['audio_reply'];
+        final audioMime = data['audio_mime'];
 
         if (newSession) {
           currentSessionId = sid;
@@ -233,10 +234,11 @@ class ChatState extends ChangeNotifier {
           'message': botReply,
           'timestamp': DateTime.now().toIso8601String(),
           'audio_reply': audioReply,
+          'audio_mime': audioMime,
         });
 
         if (isVoiceMessage && audioReply != null) {
-          await playAudioFromBase64(audioReply);
+          await playAudioFromBase64(audioReply, mimeType: audioMime);
         }
       } else {
         debugPrint('sendMessage failed: ${resp.statusCode} ${resp.body}');
@@ -254,12 +256,13 @@ class ChatState extends ChangeNotifier {
     }
   }
 
-  Future<void> playAudioFromBase64(String base64Audio) async {
+  Future<void> playAudioFromBase64(String base64Audio, {String? mimeType}) async {
     try {
       setPlayingAudio(true);
       final audioBytes = base64Decode(base64Audio);
       final tempDir = await getTemporaryDirectory();
-      final audioFile = File('${tempDir.path}/temp_audio.mp3');
+      final ext = mimeType == 'audio/wav' ? 'wav' : 'mp3';
+      final audioFile = File('${tempDir.path}/temp_audio.$ext');
       await audioFile.writeAsBytes(audioBytes);
 
       final audioPlayer = AudioPlayer();
@@ -1284,7 +1287,7 @@ class _ChatHomePageState extends State<ChatHomePage> {
                           ),
                           onPressed: () {
                             if (!state.isPlayingAudio) {
-                              state.playAudioFromBase64(m['audio_reply']);
+                              state.playAudioFromBase64(m['audio_reply'], mimeType: m['audio_mime']);
                             }
                           },
                         ),